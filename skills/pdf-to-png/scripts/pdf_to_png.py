@@ -1,96 +1,270 @@
 import argparse
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from itertools import groupby
 from pathlib import Path
 
 import fitz  # PyMuPDF
 
 
-def iter_pdfs(root: Path, recursive: bool):
-    seen = set()
-    patterns = ["*.pdf", "*.PDF"] if recursive else ["*.pdf", "*.PDF"]
-    glob_fn = root.rglob if recursive else root.glob
-    for pattern in patterns:
-        for p in glob_fn(pattern):
-            if p not in seen:
-                seen.add(p)
-                yield p
+def iter_pdfs(root: Path, recursive: bool, exclude: Path = None):
+    # Single os.scandir walk with a case-insensitive suffix test. DirEntry
+    # types come from readdir, so there is no stat() or Path() per entry.
+    # The `exclude` tree (pdf/) is pruned so PDFs organized by earlier runs
+    # are not rendered again into png/pdf/ and then moved into pdf/pdf/.
+    skip = str(exclude) if exclude is not None else None
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for e in entries:
+                if e.is_dir(follow_symlinks=False):
+                    if recursive and e.path != skip:
+                        stack.append(e.path)
+                elif e.name.lower().endswith(".pdf") and e.is_file():
+                    yield Path(e.path)
 
 
 def ensure_dir(p: Path):
     p.mkdir(parents=True, exist_ok=True)
 
 
-def convert_pdf(pdf_path: Path, in_root: Path, out_root: Path, dpi: int, force: bool, pdf_dest: Path = None):
+# Pages handed to a worker per task. Big enough to amortise re-opening the
+# document in the worker, small enough that one huge PDF still spreads across
+# every core.
+PAGES_PER_TASK = 8
+
+# ProcessPoolExecutor rejects more than 61 workers on Windows
+WINDOWS_MAX_WORKERS = 61
+
+# MuPDF caches decoded images and glyphs in a process-wide store that scanned
+# books can grow past 1 GB per worker. It is checked once per page batch
+# (PAGES_PER_TASK pages) and trimmed once it passes this size.
+STORE_MAX_BYTES = 256 << 20
+
+# Encoded pages waiting for the writer thread; bounds memory held per worker.
+WRITE_QUEUE_DEPTH = 4
+
+# PNGs are written here (inside each output folder) and renamed into place,
+# so a crash never leaves a truncated PNG under its final name.
+STAGING_DIR_NAME = ".staging"
+
+
+def output_dir(pdf_path: Path, in_root: Path, out_root: Path) -> Path:
+    """Output folder for a PDF, mirroring its folder relative to in_root."""
+    return out_root / pdf_path.parent.relative_to(in_root)
+
+
+def page_names(stem: str, page_count: int):
+    """PNG file names for every page of a PDF with the given stem."""
+    if page_count == 1:
+        return [f"{stem}.png"]
+    fmt = f"{stem}_p{{:03d}}.png"
+    return [fmt.format(i + 1) for i in range(page_count)]
+
+
+def done_marker(out_dir: Path, stem: str) -> Path:
+    """
+    Marker written after a PDF converts completely. It holds the page count
+    and the source stamp, so later runs can skip an unchanged PDF without
+    opening it.
+    """
+    return out_dir / f".{stem}.done"
+
+
+def source_stamp(pdf_path: Path) -> str:
+    """Size and mtime of a PDF; a replaced or edited PDF gets a new stamp."""
+    st = os.stat(pdf_path)
+    return f"{st.st_size} {st.st_mtime_ns}"
+
+
+def mark_done(marker: Path, page_count: int, stamp: str) -> None:
+    """Record that all page_count pages of the PDF with this stamp have been written."""
+    marker.write_text(f"{page_count} {stamp}")
+
+
+def plan_pdf(pdf_path: Path, in_root: Path, out_root: Path, force: bool):
     """
-    Convert one PDF to one-or-many PNGs.
+    Work out which pages of one PDF still need rendering.
     Output naming:
       - single-page PDF -> <stem>.png
       - multi-page PDF  -> <stem>_p001.png, <stem>_p002.png, ...
     Output folder mirrors input folder structure relative to in_root.
+
+    The document is only opened to read its page count, and not at all when
+    its done marker shows every page already exists; rendering happens in
+    render_pages. Returns (page_count, jobs, status, stamp) where jobs is a
+    list of (page_index, out_path), status is None when there is work to do
+    and stamp is the source_stamp to record in the done marker.
     """
-    rel_parent = pdf_path.parent.relative_to(in_root)
-    out_dir = out_root / rel_parent
+    out_dir = output_dir(pdf_path, in_root, out_root)
     ensure_dir(out_dir)
+    stem = pdf_path.stem
+
+    # One directory listing instead of a stat() per expected page
+    existing = set() if force else {e.name for e in os.scandir(out_dir)}
 
     try:
-        doc = fitz.open(pdf_path)
+        stamp = source_stamp(pdf_path)
+    except OSError as e:
+        return (0, [], f"open_failed: {e}", None)
+
+    # Incremental re-runs: trust the marker if it was written for this exact
+    # PDF (same size and mtime) and all its pages are still there
+    marker = done_marker(out_dir, stem)
+    if marker.name in existing:
+        try:
+            count, marked_stamp = marker.read_text().split(" ", 1)
+            page_count = int(count)
+        except (OSError, ValueError):
+            page_count = None
+        if (
+            page_count is not None
+            and marked_stamp == stamp
+            and all(n in existing for n in page_names(stem, page_count))
+        ):
+            return (page_count, [], "skipped_existing", stamp)
+
+    try:
+        with fitz.open(pdf_path) as doc:
+            page_count = doc.page_count
     except Exception as e:
-        return (pdf_path, 0, f"open_failed: {e}")
+        return (0, [], f"open_failed: {e}", None)
+
+    jobs = []
+    for i, name in enumerate(page_names(stem, page_count)):
+        if name in existing:
+            continue
+        jobs.append((i, out_dir / name))
+
+    # If not forcing, skip if every expected output exists
+    if not jobs and not force:
+        mark_done(marker, page_count, stamp)
+        return (page_count, [], "skipped_existing", stamp)
+    if jobs:
+        # Created once here so write_png only writes and renames per page
+        ensure_dir(out_dir / STAGING_DIR_NAME)
+    return (page_count, jobs, None, stamp)
+
+
+def write_png(data: bytes, out_path: Path) -> None:
+    """
+    Write encoded PNG bytes into the staging folder in one write() call,
+    then rename into place (same filesystem, so the rename is atomic).
+    The staging folder is created by plan_pdf.
+    """
+    staged = out_path.parent / STAGING_DIR_NAME / out_path.name
+    with open(staged, "wb") as f:
+        f.write(data)
+    os.replace(staged, out_path)
+
+
+def trim_store() -> None:
+    """
+    Empty MuPDF's store if it has grown past STORE_MAX_BYTES. PyMuPDF builds
+    that cannot report the size (store_size is None) always empty it, which
+    is why this runs once per batch rather than per page.
+    """
+    size = fitz.TOOLS.store_size
+    if callable(size):  # property on older PyMuPDF, method on newer
+        size = size()
+    if size is None or size > STORE_MAX_BYTES:
+        fitz.TOOLS.store_shrink(100)
 
-    page_count = doc.page_count
+
+@lru_cache(maxsize=8)
+def matrix_for_dpi(dpi: int):
+    """
+    Scaling matrix for rendering at dpi (PDF user space is 72 dpi).
+    Built once per worker process; fitz.Matrix cannot be pickled.
+    """
     zoom = dpi / 72.0
-    matrix = fitz.Matrix(zoom, zoom)
+    return fitz.Matrix(zoom, zoom)
 
-    def out_name(i: int) -> str:
-        stem = pdf_path.stem
-        if page_count == 1:
-            return f"{stem}.png"
-        return f"{stem}_p{i+1:03d}.png"
 
-    # If not forcing, skip if every expected output exists
-    if not force:
-        all_exist = True
-        for i in range(page_count):
-            if not (out_dir / out_name(i)).exists():
-                all_exist = False
-                break
-        if all_exist:
-            doc.close()
-            # Still move PDF if organizing
-            if pdf_dest is not None:
-                rel_parent = pdf_path.parent.relative_to(in_root)
-                pdf_out_dir = pdf_dest / rel_parent
-                ensure_dir(pdf_out_dir)
-                new_pdf_path = pdf_out_dir / pdf_path.name
-                if not new_pdf_path.exists():
-                    pdf_path.rename(new_pdf_path)
-            return (pdf_path, page_count, "skipped_existing")
+def render_pages(pdf_path: Path, jobs, dpi: int, gray: bool = False):
+    """
+    Render a batch of (page_index, out_path) jobs from one PDF. Runs in a
+    worker process, so the document is opened here rather than passed in.
+    Returns (written, error) where error is None on success.
+    With gray, pages render to single-channel pixmaps (1 byte/pixel vs 3).
+
+    Rendering and PNG encoding both hold the GIL inside PyMuPDF, so they stay
+    on this thread; disk writes are handed to a writer thread so the next page
+    renders while the previous one is written.
+    """
+    matrix = matrix_for_dpi(dpi)
+    colorspace = fitz.csGRAY if gray else fitz.csRGB
 
+    encoded = queue.Queue(maxsize=WRITE_QUEUE_DEPTH)
     written = 0
+    write_error = None
+
+    def writer() -> None:
+        nonlocal written, write_error
+        while True:
+            item = encoded.get()
+            if item is None:
+                return
+            if write_error is not None:
+                continue  # keep draining so the renderer never blocks
+            data, out_path = item
+            try:
+                write_png(data, out_path)
+                written += 1
+            except Exception as e:
+                write_error = e
+
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+
+    error = None
     try:
-        for i in range(page_count):
-            out_path = out_dir / out_name(i)
-            if out_path.exists() and not force:
-                continue
-            page = doc.load_page(i)
-            pix = page.get_pixmap(matrix=matrix, alpha=False)
-            pix.save(out_path.as_posix())
-            written += 1
+        with fitz.open(pdf_path) as doc:
+            for i, out_path in jobs:
+                if write_error is not None:
+                    break
+                page = doc.load_page(i)
+                pix = page.get_pixmap(matrix=matrix, colorspace=colorspace, alpha=False)
+                data = pix.tobytes("png")
+                # Drop the pixmap before blocking on the queue so at most one
+                # raw page is alive alongside the encoded ones
+                pix = None
+                page = None
+                encoded.put((data, out_path))
     except Exception as e:
-        doc.close()
-        return (pdf_path, written, f"render_failed: {e}")
+        error = str(e)
+    finally:
+        encoded.put(None)
+        thread.join()
+        # Once per batch: the document is closed, so its cached resources
+        # are no longer needed by this worker
+        trim_store()
 
-    doc.close()
+    if error is None and write_error is not None:
+        error = str(write_error)
+    return (written, error)
 
-    # If organize mode, move PDF to pdf subfolder
-    if pdf_dest is not None:
-        rel_parent = pdf_path.parent.relative_to(in_root)
-        pdf_out_dir = pdf_dest / rel_parent
-        ensure_dir(pdf_out_dir)
-        new_pdf_path = pdf_out_dir / pdf_path.name
-        if not new_pdf_path.exists():
-            pdf_path.rename(new_pdf_path)
 
-    return (pdf_path, written, "ok")
+def move_pdfs(moves) -> int:
+    """
+    Move converted PDFs into the pdf/ tree. moves is a list of (src, dst);
+    each destination folder is created and listed once, and PDFs already
+    present there are left in place. Returns the number of PDFs moved.
+    """
+    moved = 0
+    for dst_dir, group in groupby(sorted(moves, key=lambda m: m[1].parent), key=lambda m: m[1].parent):
+        ensure_dir(dst_dir)
+        existing = {e.name for e in os.scandir(dst_dir)}
+        for src, dst in group:
+            if dst.name in existing:
+                continue
+            os.rename(src, dst)
+            moved += 1
+    return moved
 
 
 def main():
@@ -107,7 +281,18 @@ def main():
     ap.add_argument("--recursive", action="store_true", help="Recurse into subfolders")
     ap.add_argument("--force", action="store_true", help="Overwrite existing PNGs")
     ap.add_argument("--organize", action="store_true", help="Organize files into pdf/ and png/ subfolders")
+    ap.add_argument("--gray", action="store_true", help="Render grayscale PNGs (smaller and faster for text-only PDFs)")
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=min(os.cpu_count() or 1, 4),
+        help="Number of worker processes rendering pages in parallel (default: min(cpu count, 4))",
+    )
     args = ap.parse_args()
+    if args.workers < 1:
+        raise SystemExit("--workers must be at least 1")
+    if sys.platform == "win32":
+        args.workers = min(args.workers, WINDOWS_MAX_WORKERS)
 
     in_root = Path(args.folder).expanduser().resolve()
     if not in_root.exists() or not in_root.is_dir():
@@ -124,31 +309,101 @@ def main():
         pdf_dest = (in_root / "pdf").resolve()
         ensure_dir(pdf_dest)
 
-    pdfs = list(iter_pdfs(in_root, args.recursive))
-    if not pdfs:
-        print(f"No PDFs found in {in_root} (recursive={args.recursive})")
-        return
-
+    pdf_count = 0
     total_written = 0
+    moves = []
     errors = 0
 
-    for pdf in pdfs:
-        pdf_path, written, status = convert_pdf(pdf, in_root, out_root, args.dpi, args.force, pdf_dest)
+    def finish(pdf_path: Path, written: int, status: str, page_count: int = 0, stamp: str = None) -> None:
+        nonlocal total_written, errors
         if status.startswith("open_failed") or status.startswith("render_failed"):
             errors += 1
         if status == "ok":
             total_written += written
+            mark_done(done_marker(output_dir(pdf_path, in_root, out_root), pdf_path.stem), page_count, stamp)
+        # If organize mode, queue PDF for the pdf subfolder (also when already converted)
+        if pdf_dest is not None and status in ("ok", "skipped_existing"):
+            moves.append((pdf_path, pdf_dest / pdf_path.relative_to(in_root)))
         print(f"{status:16} | wrote {written:4d} | {pdf_path}")
 
+    # Per-PDF bookkeeping while its page batches are in flight:
+    # pdf_path -> {"tasks": outstanding batches, "written": pages, "error": first error,
+    #              "pages": page count, "stamp": source stamp}
+    progress = {}
+    # future -> pdf_path for every batch submitted but not yet collected
+    pending = {}
+    # Cap in-flight batches so the queue (and results) cannot grow unbounded.
+    max_pending = args.workers * 2
+
+    def collect(fut) -> None:
+        pdf_path = pending.pop(fut)
+        written, error = fut.result()
+        state = progress[pdf_path]
+        state["tasks"] -= 1
+        state["written"] += written
+        if error is not None and state["error"] is None:
+            state["error"] = error
+        if state["tasks"] == 0:
+            del progress[pdf_path]
+            if state["error"] is not None:
+                finish(pdf_path, state["written"], f"render_failed: {state['error']}")
+            else:
+                finish(pdf_path, state["written"], "ok", state["pages"], state["stamp"])
+
+    def drain(block_until: int) -> None:
+        while len(pending) > block_until:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                collect(fut)
+
+    # Rendering is CPU-bound inside MuPDF and holds the GIL, so fan out across
+    # processes. Work is split into page batches across document boundaries so
+    # a few huge PDFs cannot leave cores idle. Only picklable arguments cross
+    # the boundary; each worker opens its own fitz.Document. Work is
+    # submitted as PDFs are discovered, so rendering starts before a large
+    # tree has been fully scanned.
+    out_dirs = set()  # staging folders here are removed once workers finish
+    with ProcessPoolExecutor(max_workers=args.workers) as ex:
+        for pdf in iter_pdfs(in_root, args.recursive, exclude=pdf_dest):
+            pdf_count += 1
+            page_count, jobs, status, stamp = plan_pdf(pdf, in_root, out_root, args.force)
+            if status is not None:
+                finish(pdf, page_count, status)
+                continue
+            if not jobs:
+                finish(pdf, 0, "ok", page_count, stamp)
+                continue
+            out_dirs.add(jobs[0][1].parent)
+            batches = [jobs[k:k + PAGES_PER_TASK] for k in range(0, len(jobs), PAGES_PER_TASK)]
+            progress[pdf] = {"tasks": len(batches), "written": 0, "error": None, "pages": page_count, "stamp": stamp}
+            for batch in batches:
+                drain(max_pending - 1)
+                pending[ex.submit(render_pages, pdf, batch, args.dpi, args.gray)] = pdf
+        drain(0)
+
+    for out_dir in out_dirs:
+        try:
+            (out_dir / STAGING_DIR_NAME).rmdir()
+        except OSError:
+            pass  # missing, or holds leftovers from a failed write
+
+    if not pdf_count:
+        print(f"No PDFs found in {in_root} (recursive={args.recursive})")
+        return
+
+    # Moves wait until every batch has finished so workers never lose a PDF
+    # mid-render, and are grouped so each destination folder is set up once.
+    moved = move_pdfs(moves)
+
     print("\nSummary")
     print(f"  Input:        {in_root}")
     print(f"  PNG output:   {out_root}")
     if pdf_dest:
         print(f"  PDF output:   {pdf_dest}")
-    print(f"  PDFs:         {len(pdfs)}")
+    print(f"  PDFs:         {pdf_count}")
     print(f"  PNGs written: {total_written}")
     if pdf_dest:
-        print(f"  PDFs moved:   {len(pdfs)}")
+        print(f"  PDFs moved:   {moved}")
     print(f"  Errors:       {errors}")
 
 
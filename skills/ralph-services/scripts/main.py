@@ -6,8 +6,11 @@ Commands:
   --init <path>        Initialize Ralph in a project
   --update [<path>]    Update Ralph templates (preserves runs/)
   --doctor [<path>]    Validate Ralph setup
+  --update-all <dir>   Update every project under <dir> that has a ralph/ folder
+  --doctor-all <dir>   Validate every project under <dir> that has a ralph/ folder
   --set-root <path>    Save canonical Ralph root to user config
   --print-root         Print resolved canonical Ralph root and source
+                       (add --check-dirty to report uncommitted changes)
   --help               Show help
 """
 
@@ -17,10 +20,17 @@ import os
 import shutil
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+try:
+    import orjson  # optional: faster JSON encode/decode when installed
+except ImportError:
+    orjson = None
+
 # =============================================================================
 # CONSTANTS
 # =============================================================================
@@ -54,37 +64,76 @@ EXCLUDED_DIRS = {"runs", ".git"}
 EXCLUDED_FILES = {".gitignore"}
 
 
-def sync_directory(src: Path, dst: Path, exclude_dirs: set[str], exclude_files: set[str]) -> dict:
+def copy_file(src: Path, dst: Path) -> None:
     """
-    Recursively sync src directory to dst, excluding specified dirs/files.
-    Returns stats dict with counts.
+    Copy src to dst with metadata, like shutil.copy2, but let the kernel move
+    the bytes via os.copy_file_range where available (Linux 4.5+).
+    Falls back to shutil.copyfile when the call is missing or unsupported.
     """
-    stats = {"files_copied": 0, "dirs_created": 0, "skipped": []}
+    copy_range = getattr(os, "copy_file_range", None)
+    if copy_range is None:
+        shutil.copyfile(src, dst)
+    else:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = copy_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+        except OSError:
+            # EXDEV/ENOSYS/EINVAL: older kernel or filesystem without support
+            shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
+
+# Template copies are small, independent and I/O-bound
+COPY_WORKERS = 8
 
+
+def plan_sync(src: Path, dst: Path, exclude_dirs: set[str], exclude_files: set[str], stats: dict, copies: list) -> None:
+    """
+    Walk src, creating directories under dst and appending (src, dst) file
+    pairs to copies. Excluded dirs/files are recorded in stats["skipped"].
+    """
     # Ensure destination exists
     if not dst.exists():
         dst.mkdir(parents=True, exist_ok=True)
         stats["dirs_created"] += 1
 
-    for item in src.iterdir():
-        if item.name in exclude_dirs and item.is_dir():
-            stats["skipped"].append(str(item.relative_to(src)))
-            continue
-        if item.name in exclude_files and item.is_file():
-            stats["skipped"].append(str(item.relative_to(src)))
-            continue
-
-        dst_item = dst / item.name
-
-        if item.is_dir():
-            # Recursively sync subdirectory
-            sub_stats = sync_directory(item, dst_item, exclude_dirs, exclude_files)
-            stats["files_copied"] += sub_stats["files_copied"]
-            stats["dirs_created"] += sub_stats["dirs_created"]
-            stats["skipped"].extend(sub_stats["skipped"])
-        else:
-            # Copy file
-            shutil.copy2(item, dst_item)
+    # One scandir per directory; DirEntry carries the file type from readdir
+    with os.scandir(src) as entries:
+        for entry in entries:
+            is_dir = entry.is_dir()
+            if entry.name in exclude_dirs and is_dir:
+                stats["skipped"].append(entry.name)
+                continue
+            if entry.name in exclude_files and not is_dir:
+                stats["skipped"].append(entry.name)
+                continue
+
+            item = Path(entry.path)
+            dst_item = dst / entry.name
+
+            if is_dir:
+                plan_sync(item, dst_item, exclude_dirs, exclude_files, stats, copies)
+            else:
+                copies.append((item, dst_item))
+
+
+def sync_directory(src: Path, dst: Path, exclude_dirs: set[str], exclude_files: set[str]) -> dict:
+    """
+    Recursively sync src directory to dst, excluding specified dirs/files.
+    Returns stats dict with counts.
+    """
+    stats = {"files_copied": 0, "dirs_created": 0, "skipped": []}
+    copies = []
+    plan_sync(src, dst, exclude_dirs, exclude_files, stats, copies)
+
+    # Every copy has its own destination, so they can run concurrently
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as ex:
+        for _ in ex.map(lambda pair: copy_file(*pair), copies):
             stats["files_copied"] += 1
 
     return stats
@@ -168,33 +217,98 @@ def save_ralph_root(path: Path) -> None:
 # VERSION & METADATA
 # =============================================================================
 
+def dump_json(obj) -> bytes:
+    """Serialize obj as indented JSON bytes (orjson if available)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+def load_json(data: bytes):
+    """Parse JSON bytes (orjson if available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@lru_cache(maxsize=None)
+def read_version_file(version_file: Path, mtime_ns: int) -> dict:
+    """Parse version.json. mtime_ns is part of the cache key, so edits are re-read."""
+    return load_json(version_file.read_bytes())
+
+
 def get_source_version(ralph_root: Path) -> dict:
-    """Read version info from canonical Ralph root."""
+    """
+    Read version info from canonical Ralph root.
+    Parsed once per (path, mtime); repeat calls cost a single stat().
+    """
     version_file = ralph_root / "version.json"
-    if version_file.exists():
-        return json.loads(version_file.read_text())
-    return {"version": "unknown", "releaseDate": "unknown", "templateCount": 0}
+    try:
+        mtime_ns = version_file.stat().st_mtime_ns
+    except OSError:
+        return {"version": "unknown", "releaseDate": "unknown", "templateCount": 0}
+    return read_version_file(version_file, mtime_ns)
+
+
+def find_git_dir(path: Path) -> Optional[Path]:
+    """Locate the git directory for path (or a parent), following .git files."""
+    for candidate in (path, *path.parents):
+        dot_git = candidate / ".git"
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            # Worktrees and submodules use a "gitdir: <path>" pointer file
+            content = dot_git.read_text().strip()
+            if content.startswith("gitdir:"):
+                git_dir = Path(content[len("gitdir:"):].strip())
+                return git_dir if git_dir.is_absolute() else (candidate / git_dir).resolve()
+            return None
+    return None
 
 
+@lru_cache(maxsize=None)
 def get_source_commit(ralph_root: Path) -> str:
-    """Get git commit hash from canonical Ralph root."""
+    """
+    Get git commit hash from canonical Ralph root (cached per invocation).
+    Reads HEAD and refs straight from the git directory instead of running git.
+    """
     try:
-        result = subprocess.run(
-            ["git", "rev-parse", "HEAD"],
-            cwd=ralph_root,
-            capture_output=True,
-            text=True,
-            timeout=5,
-        )
-        if result.returncode == 0:
-            return result.stdout.strip()[:12]
-    except Exception:
+        git_dir = find_git_dir(ralph_root.resolve())
+        if git_dir is None:
+            return "no-git"
+
+        head = (git_dir / "HEAD").read_text().strip()
+        if not head.startswith("ref: "):
+            return head[:12]  # detached HEAD
+        ref = head[len("ref: "):]
+
+        # Linked worktrees keep branch refs in the shared common directory
+        common_dir = git_dir
+        commondir_file = git_dir / "commondir"
+        if commondir_file.exists():
+            common_dir = (git_dir / commondir_file.read_text().strip()).resolve()
+
+        for base in (git_dir, common_dir):
+            ref_file = base / ref
+            if ref_file.is_file():
+                return ref_file.read_text().strip()[:12]
+
+        packed_refs = common_dir / "packed-refs"
+        if packed_refs.exists():
+            for line in packed_refs.read_text().splitlines():
+                if line.endswith(" " + ref) and not line.startswith("#"):
+                    return line.split(" ", 1)[0][:12]
+    except OSError:
         pass
     return "no-git"
 
 
+@lru_cache(maxsize=None)
 def is_repo_dirty(path: Path) -> bool:
-    """Check if git repo at path has uncommitted changes."""
+    """
+    Check if git repo at path has uncommitted changes (cached per invocation,
+    so --update-all runs git status on the canonical root once, not per project).
+    """
     try:
         result = subprocess.run(
             ["git", "status", "--porcelain"],
@@ -225,7 +339,7 @@ def create_meta(ralph_root: Path, template_count: int) -> dict:
 def write_meta(target: Path, meta: dict) -> None:
     """Write .ralph-meta.json to target ralph directory."""
     meta_file = target / RALPH_META_FILE
-    meta_file.write_text(json.dumps(meta, indent=2))
+    meta_file.write_bytes(dump_json(meta))
 
 
 def read_meta(target: Path) -> Optional[dict]:
@@ -233,7 +347,7 @@ def read_meta(target: Path) -> Optional[dict]:
     meta_file = target / RALPH_META_FILE
     if meta_file.exists():
         try:
-            return json.loads(meta_file.read_text())
+            return load_json(meta_file.read_bytes())
         except Exception:
             pass
     return None
@@ -275,7 +389,7 @@ def cmd_init(target_path: str) -> int:
     runs_dir.mkdir(parents=True, exist_ok=True)
     src_runs_readme = ralph_root / "runs" / "README.md"
     if src_runs_readme.exists():
-        shutil.copy2(src_runs_readme, runs_dir / "README.md")
+        copy_file(src_runs_readme, runs_dir / "README.md")
 
     # Write metadata
     meta = create_meta(ralph_root, stats["files_copied"])
@@ -444,6 +558,47 @@ def cmd_doctor(target_path: Optional[str]) -> int:
     return 1 if issues else 0
 
 
+def find_ralph_projects(parent: Path) -> list[Path]:
+    """Return child directories of parent that contain a ralph/ directory."""
+    return sorted(d for d in parent.iterdir() if d.is_dir() and (d / "ralph").is_dir())
+
+
+def run_for_projects(parent_path: str, label: str, command) -> int:
+    """Run command(project_path) for every Ralph project under parent_path."""
+    parent = Path(parent_path).resolve()
+    if not parent.is_dir():
+        print(f"ERROR: Path does not exist: {parent}")
+        return 1
+
+    projects = find_ralph_projects(parent)
+    if not projects:
+        print(f"No Ralph projects found under {parent}")
+        return 0
+
+    failed = []
+    for project in projects:
+        print("=" * 72)
+        if command(str(project)) != 0:
+            failed.append(project)
+        print("")
+
+    print("=" * 72)
+    print(f"{label}: {len(projects) - len(failed)}/{len(projects)} projects succeeded")
+    for project in failed:
+        print(f"  FAILED: {project}")
+    return 1 if failed else 0
+
+
+def cmd_update_all(parent_path: str, force: bool = False) -> int:
+    """Update every Ralph project under parent_path in one invocation."""
+    return run_for_projects(parent_path, "Update", lambda p: cmd_update(p, force=force))
+
+
+def cmd_doctor_all(parent_path: str) -> int:
+    """Validate every Ralph project under parent_path in one invocation."""
+    return run_for_projects(parent_path, "Doctor", cmd_doctor)
+
+
 def cmd_set_root(path: str) -> int:
     """Save canonical Ralph root to user config."""
     root = Path(path).resolve()
@@ -462,8 +617,12 @@ def cmd_set_root(path: str) -> int:
     return 0
 
 
-def cmd_print_root() -> int:
-    """Print resolved canonical Ralph root and its source."""
+def cmd_print_root(check_dirty: bool = False) -> int:
+    """
+    Print resolved canonical Ralph root and its source.
+    The uncommitted-changes check runs `git status` and is only done when
+    check_dirty is set.
+    """
     path, source = find_ralph_root_with_source()
 
     source_labels = {
@@ -476,13 +635,14 @@ def cmd_print_root() -> int:
     if path:
         version_info = get_source_version(path)
         commit = get_source_commit(path)
-        dirty = is_repo_dirty(path)
 
         print(f"Canonical Ralph root: {path}")
         print(f"  Source: {source_labels[source]}")
         print(f"  Version: {version_info.get('version', 'unknown')}")
         print(f"  Commit: {commit}")
-        if dirty:
+        if not check_dirty:
+            print(f"  Status: not checked (use --check-dirty)")
+        elif is_repo_dirty(path):
             print(f"  Status: DIRTY (uncommitted changes)")
         else:
             print(f"  Status: clean")
@@ -529,6 +689,16 @@ def main():
         metavar="PATH",
         help="Validate Ralph setup. Defaults to current directory.",
     )
+    parser.add_argument(
+        "--update-all",
+        metavar="DIR",
+        help="Update every project under DIR that contains a ralph/ directory",
+    )
+    parser.add_argument(
+        "--doctor-all",
+        metavar="DIR",
+        help="Validate every project under DIR that contains a ralph/ directory",
+    )
     parser.add_argument(
         "--set-root",
         metavar="PATH",
@@ -539,18 +709,27 @@ def main():
         action="store_true",
         help="Print resolved canonical Ralph root and its source",
     )
+    parser.add_argument(
+        "--check-dirty",
+        action="store_true",
+        help="With --print-root, also check the canonical repo for uncommitted changes (runs git status)",
+    )
 
     args = parser.parse_args()
 
     # Dispatch to command
     if args.print_root:
-        return cmd_print_root()
+        return cmd_print_root(check_dirty=args.check_dirty)
     elif args.init:
         return cmd_init(args.init)
     elif args.update is not None:
         return cmd_update(args.update if args.update != "." else None, force=args.force)
     elif args.doctor is not None:
         return cmd_doctor(args.doctor if args.doctor != "." else None)
+    elif args.update_all:
+        return cmd_update_all(args.update_all, force=args.force)
+    elif args.doctor_all:
+        return cmd_doctor_all(args.doctor_all)
     elif args.set_root:
         return cmd_set_root(args.set_root)
     else:
@@ -50,14 +50,14 @@ try {
     throw "FATAL: venv python not found at $VenvPy - aborting to prevent global installs"
   }
 
-  # 3) Ensure Pillow installed (import test)
-  & $VenvPy -c "from PIL import Image" 2>$null
+  # 3) Ensure Pillow + NumPy installed (import test)
+  & $VenvPy -c "from PIL import Image; import numpy" 2>$null
   if ($LASTEXITCODE -ne 0) {
-    Write-Host "Installing pillow..."
+    Write-Host "Installing pillow and numpy..."
     & $VenvPy -m pip install --upgrade pip
     if ($LASTEXITCODE -ne 0) { throw "pip upgrade failed" }
-    & $VenvPy -m pip install --upgrade pillow
-    if ($LASTEXITCODE -ne 0) { throw "pillow install failed" }
+    & $VenvPy -m pip install --upgrade pillow numpy
+    if ($LASTEXITCODE -ne 0) { throw "pillow/numpy install failed" }
   }
 
   # 4) Run splitter
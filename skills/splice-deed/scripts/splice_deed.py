@@ -1,136 +1,274 @@
 import argparse
+import errno
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import chain
 from pathlib import Path
 from typing import Iterable, Tuple
 
+import numpy as np
 from PIL import Image
 
+try:
+    from numba import njit  # optional: fused gutter scan kernel when installed
+except ImportError:
+    njit = None
+
 IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".webp"}
 
+# Longest side of the grayscale image used for gutter detection
+ANALYSIS_MAX_DIM = 900
 
-def ensure_dir(p: Path) -> None:
-    p.mkdir(parents=True, exist_ok=True)
+# Modes each output format can store directly. Other modes are converted to
+# RGB once, before cropping, so both halves reuse the converted pixels.
+SAVE_MODES = {
+    ".jpg": {"1", "L", "RGB", "CMYK"},
+    ".jpeg": {"1", "L", "RGB", "CMYK"},
+    ".png": {"1", "L", "LA", "I", "I;16", "P", "RGB", "RGBA"},
+}
 
+# Encoder overrides per output format, trading file size for save speed.
+# Formats not listed (JPEG, TIFF) keep Pillow's defaults, which are already
+# the fast path for them.
+SAVE_PARAMS = {
+    ".png": {"compress_level": 1},
+    ".webp": {"method": 0},
+}
 
-def iter_images(root: Path, recursive: bool) -> Iterable[Path]:
-    glob_fn = root.rglob if recursive else root.glob
-    seen = set()
-    for ext in sorted(IMAGE_EXTS):
-        for pat in (f"*{ext}", f"*{ext.upper()}"):
-            for p in glob_fn(pat):
-                if p not in seen:
-                    seen.add(p)
-                    yield p
+# Most images handed to a worker per task; within a task the next image is
+# decoded on a background thread while the current one is analysed and saved.
+# Smaller folders get smaller tasks so every --jobs worker still has work.
+IMAGES_PER_TASK = 8
 
+# ProcessPoolExecutor rejects more than 61 workers on Windows
+WINDOWS_MAX_WORKERS = 61
 
-def is_probably_double_page(w: int, h: int) -> bool:
-    return (w / max(h, 1)) >= 1.35
+# Progress lines are written to stdout in blocks of this many images
+PROGRESS_LINES_PER_WRITE = 64
 
 
-def downsample_for_analysis(img: Image.Image, max_dim: int = 900):
-    w, h = img.size
-    scale = max(w, h) / float(max_dim)
-    if scale <= 1.0:
-        return img, 1.0
-    new_w = max(1, int(w / scale))
-    new_h = max(1, int(h / scale))
-    return img.resize((new_w, new_h), Image.BILINEAR), scale
+# Directories already created by this process; most images share a folder,
+# so later calls skip the mkdir syscalls entirely
+created_dirs = set()
 
 
-def gutter_score_vertical(gray: Image.Image, x_center: int, band_px: int, y0: int, y1: int) -> int:
-    w, h = gray.size
-    x0 = max(0, x_center - band_px // 2)
-    x1 = min(w, x0 + band_px)
-    if x1 <= x0:
-        return 10**18
-    band = gray.crop((x0, y0, x1, y1))
-    hist = band.histogram()
-    return sum((255 - i) * c for i, c in enumerate(hist))
+def ensure_dir(p: Path) -> None:
+    if p in created_dirs:
+        return
+    p.mkdir(parents=True, exist_ok=True)
+    created_dirs.add(p)
+
+
+def iter_images(root: Path, recursive: bool, exclude: Iterable[Path] = ()) -> Iterable[Path]:
+    # One os.scandir walk with a case-insensitive extension lookup, instead of
+    # a separate glob (and directory walk) per extension and letter case.
+    # The `exclude` trees (our own output folders) are pruned, so a rerun does
+    # not list, decode and re-check every earlier splice.
+    skip = {str(p) for p in exclude}
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for e in entries:
+                if e.is_dir(follow_symlinks=False):
+                    if recursive and e.path not in skip:
+                        stack.append(e.path)
+                elif os.path.splitext(e.name)[1].lower() in IMAGE_EXTS and e.is_file():
+                    yield Path(e.path)
 
 
-def gutter_score_horizontal(gray: Image.Image, y_center: int, band_px: int, x0: int, x1: int) -> int:
-    w, h = gray.size
-    y0 = max(0, y_center - band_px // 2)
-    y1 = min(h, y0 + band_px)
-    if y1 <= y0:
-        return 10**18
-    band = gray.crop((x0, y0, x1, y1))
-    hist = band.histogram()
-    return sum((255 - i) * c for i, c in enumerate(hist))
+def is_probably_double_page(w: int, h: int) -> bool:
+    return (w / max(h, 1)) >= 1.35
 
 
-def find_split_vertical(img: Image.Image, search: float, band: float) -> int:
-    small, scale = downsample_for_analysis(img.convert("RGB"))
-    gray = small.convert("L")
+def downsample_for_analysis(img: Image.Image, max_dim: int = ANALYSIS_MAX_DIM):
+    """Grayscale copy of img scaled to fit max_dim, and the scale factor used."""
+    # Convert straight to L (handles palette/alpha modes) before resizing, so
+    # only one channel is ever resampled
+    gray = img if img.mode == "L" else img.convert("L")
     w, h = gray.size
-    y0 = int(h * 0.08)
-    y1 = int(h * 0.92)
-
-    mid = w // 2
-    half_window = int(w * search / 2.0)
+    scale = max(w, h) / float(max_dim)
+    if scale <= 1.0:
+        return gray, 1.0
+    new_w = max(1, int(w / scale))
+    new_h = max(1, int(h / scale))
+    # Box-reduce by the largest integer factor first (much cheaper than a
+    # large bilinear resize), then refine to the exact target size
+    factor = int(scale)
+    if factor >= 2:
+        gray = gray.reduce(factor)
+    if gray.size != (new_w, new_h):
+        gray = gray.resize((new_w, new_h), Image.BILINEAR)
+    return gray, scale
+
+
+# Prefix-sum buffer reused across calls (analysis arrays never exceed
+# ANALYSIS_MAX_DIM per side); each worker process scores one axis at a time
+prefix_scratch = np.zeros(ANALYSIS_MAX_DIM + 1, dtype=np.int64)
+
+
+def ink_prefix_sum(gray: np.ndarray, axis: int) -> np.ndarray:
+    """
+    Ink per column (axis=0) or row (axis=1) of a uint8 grayscale array, as a
+    prefix sum with a leading 0, so the ink in any band [a, b) is cs[b] - cs[a].
+    The result may be a view of prefix_scratch, valid until the next call.
+    """
+    # Ink of a line is 255 * pixels - sum(pixels): sum the raw pixels rather
+    # than materialising an inverted copy of the whole array. uint32 is ample
+    # (<= 900 * 255 per line) and keeps the reduction in NumPy's SIMD kernels.
+    ink = gray.shape[axis] * 255 - gray.sum(axis=axis, dtype=np.uint32)
+    if ink.size < prefix_scratch.size:
+        cs = prefix_scratch[: ink.size + 1]
+    else:
+        cs = np.zeros(ink.size + 1, dtype=np.int64)
+    np.cumsum(ink, out=cs[1:])
+    return cs
+
+
+def gutter_score(cs: np.ndarray, center: int, band_px: int) -> int:
+    """Ink inside a band_px wide band centred on center (lower = emptier gutter)."""
+    n = cs.size - 1
+    lo = max(0, center - band_px // 2)
+    hi = min(n, lo + band_px)
+    if hi <= lo:
+        return 10**18
+    return int(cs[hi] - cs[lo])
+
+
+def band_scores(cs: np.ndarray, centers: np.ndarray, band_px: int) -> np.ndarray:
+    """Vectorised gutter_score for an array of band centres."""
+    n = cs.size - 1
+    lo = np.clip(centers - band_px // 2, 0, n)
+    hi = np.minimum(lo + band_px, n)
+    return cs[hi] - cs[lo]
+
+
+def analyze_image(img: Image.Image) -> Tuple[np.ndarray, float]:
+    """
+    Build the analysis-grade grayscale array for img once: a C-contiguous
+    uint8 array of shape (h, w), plus the factor mapping its pixels to img's.
+    """
+    gray, scale = downsample_for_analysis(img)
+    arr = np.ascontiguousarray(gray, dtype=np.uint8)
+    # arr owns a copy of the pixels; free the intermediate image right away
+    if gray is not img:
+        gray.close()
+    return arr, scale
+
+
+def scan_gutter(arr, axis, k0, k1, start, end, step, band_px):
+    """
+    Fused form of the find_split scoring, for numba: ink per line of
+    arr[k0:k1] (axis=1) or arr[:, k0:k1] (axis=0), then the emptiest band
+    among start..end by step, and the centre band's score. Returns
+    (best_pos, best_score, center_score); best_pos is -1 if there are no
+    candidates. Matches ink_prefix_sum/band_scores/gutter_score exactly.
+    """
+    n = arr.shape[axis]
+    cs = np.zeros(n + 1, dtype=np.int64)
+    if axis == 1:
+        for y in range(k0, k1):
+            for x in range(n):
+                cs[x + 1] += 255 - arr[y, x]
+    else:
+        for y in range(n):
+            line = np.int64(0)
+            for x in range(k0, k1):
+                line += 255 - arr[y, x]
+            cs[y + 1] = line
+    for i in range(n):
+        cs[i + 1] += cs[i]
+
+    best_pos = -1
+    best_score = 0
+    for c in range(start, end + 1, step):
+        lo = min(max(c - band_px // 2, 0), n)
+        hi = min(lo + band_px, n)
+        score = cs[hi] - cs[lo]
+        if best_pos < 0 or score < best_score:
+            best_pos = c
+            best_score = score
+
+    mid = n // 2
+    lo = max(0, mid - band_px // 2)
+    hi = min(n, lo + band_px)
+    center_score = cs[hi] - cs[lo] if hi > lo else 10**18
+    return best_pos, best_score, center_score
+
+
+# Compiled scan_gutter when numba is installed; find_split uses NumPy otherwise
+scan_gutter_jit = njit(cache=True)(scan_gutter) if njit is not None else None
+
+
+def find_split(arr: np.ndarray, axis: int, search: float, band: float) -> int:
+    """
+    Gutter position along axis of arr, in arr pixels: axis=1 scans x for a
+    vertical split, axis=0 scans y for a horizontal one. Only the middle 84%
+    of the other axis is scored so page edges and margins do not count.
+    """
+    n = arr.shape[axis]
+    other = arr.shape[1 - axis]
+    k0, k1 = int(other * 0.08), int(other * 0.92)
+
+    mid = n // 2
+    half_window = int(n * search / 2.0)
     start = max(1, mid - half_window)
-    end = min(w - 2, mid + half_window)
-
-    band_px = max(2, int(w * band))
-    step = max(1, int(w / 500))
-
-    best_x = mid
-    best_score = None
-
-    for x in range(start, end + 1, step):
-        s = gutter_score_vertical(gray, x, band_px, y0, y1)
-        if best_score is None or s < best_score:
-            best_score = s
-            best_x = x
-
-    center_score = gutter_score_vertical(gray, mid, band_px, y0, y1)
-    if best_score is None or best_score > center_score * 0.95:
-        best_x = mid
-
-    return int(best_x * scale)
-
-
-def find_split_horizontal(img: Image.Image, search: float, band: float) -> int:
-    small, scale = downsample_for_analysis(img.convert("RGB"))
-    gray = small.convert("L")
-    w, h = gray.size
-    x0 = int(w * 0.08)
-    x1 = int(w * 0.92)
+    end = min(n - 2, mid + half_window)
 
-    mid = h // 2
-    half_window = int(h * search / 2.0)
-    start = max(1, mid - half_window)
-    end = min(h - 2, mid + half_window)
+    band_px = max(2, int(n * band))
+    step = max(1, int(n / 500))
 
-    band_px = max(2, int(h * band))
-    step = max(1, int(h / 500))
+    if start > end:
+        return mid
+    if scan_gutter_jit is not None:
+        best_pos, best_score, center_score = scan_gutter_jit(arr, axis, k0, k1, start, end, step, band_px)
+    else:
+        cs = ink_prefix_sum(arr[k0:k1] if axis == 1 else arr[:, k0:k1], axis=1 - axis)
+        positions = np.arange(start, end + 1, step)
+        scores = band_scores(cs, positions, band_px)
+        best = int(scores.argmin())
+        best_pos = int(positions[best])
+        best_score = int(scores[best])
+        center_score = gutter_score(cs, mid, band_px)
 
-    best_y = mid
-    best_score = None
+    # Prefer the centre unless the best candidate is clearly emptier
+    if best_score > center_score * 0.95:
+        best_pos = mid
 
-    for y in range(start, end + 1, step):
-        s = gutter_score_horizontal(gray, y, band_px, x0, x1)
-        if best_score is None or s < best_score:
-            best_score = s
-            best_y = y
+    return best_pos
 
-    center_score = gutter_score_horizontal(gray, mid, band_px, x0, x1)
-    if best_score is None or best_score > center_score * 0.95:
-        best_y = mid
 
-    return int(best_y * scale)
+def locate_split(im: Image.Image, vertical: bool, search: float, band: float) -> int:
+    """
+    Split position (x if vertical, else y) in full-resolution pixels of im.
+    Analyses the already-decoded im: it has to be decoded in full for the
+    crop anyway, so a separate draft-mode decode would only add work.
+    """
+    arr, scale = analyze_image(im)
+    return int(find_split(arr, 1 if vertical else 0, search, band) * scale)
 
 
 def out_names(stem: str, suffix: str):
     return (f"{stem}_sp001{suffix}", f"{stem}_sp002{suffix}")
 
 
+def prepare_for_save(img: Image.Image, suffix: str) -> Image.Image:
+    """Return img, converted to RGB if its mode can't be saved as suffix."""
+    modes = SAVE_MODES.get(suffix.lower())
+    if modes is not None and img.mode not in modes:
+        # e.g. JPEG can't store palette/alpha modes
+        return img.convert("RGB")
+    return img
+
+
 def safe_save(img: Image.Image, path: Path) -> None:
-    """Save image, converting to RGB if needed for format compatibility."""
-    try:
-        img.save(path.as_posix())
-    except OSError:
-        # Some formats (JPEG) don't support palette/alpha modes - convert to RGB
-        img.convert("RGB").save(path.as_posix())
+    """
+    Save image with the SAVE_PARAMS for its format; img must already be in a
+    compatible mode (see prepare_for_save).
+    """
+    img.save(path.as_posix(), **SAVE_PARAMS.get(path.suffix.lower(), {}))
 
 
 def maybe_move_original(img_path: Path, in_root: Path, dest_root: Path) -> None:
@@ -140,7 +278,112 @@ def maybe_move_original(img_path: Path, in_root: Path, dest_root: Path) -> None:
     dest_path = dest_dir / img_path.name
     if dest_path.exists():
         return
-    img_path.rename(dest_path)
+    try:
+        os.replace(img_path, dest_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # double/ is on another filesystem (e.g. a mount point): copy then delete
+        shutil.move(img_path, dest_path)
+
+
+def out_paths(img_path: Path, in_root: Path, out_root: Path) -> Tuple[Path, Path]:
+    """Output paths of both splices of img_path, mirroring its folder under out_root."""
+    out_dir = out_root / img_path.parent.relative_to(in_root)
+    n1, n2 = out_names(img_path.stem, img_path.suffix)
+    return out_dir / n1, out_dir / n2
+
+
+def load_image(img_path: Path, in_root: Path, out_root: Path, args):
+    """
+    Open an image and fully decode it (Pillow releases the GIL while decoding).
+    Skip decisions are made first from the header and the output folder, so
+    no pixels are decoded for an image that will not be split: returns
+    "skipped_single" or "skipped_existing" instead of an image in that case.
+    """
+    with Image.open(img_path) as im:
+        if args.mode == "auto" and not is_probably_double_page(*im.size):
+            return "skipped_single"
+        if not args.force and all(p.exists() for p in out_paths(img_path, in_root, out_root)):
+            return "skipped_existing"
+        im.load()
+    return im
+
+
+def process_one(img_path: Path, im: Image.Image, in_root: Path, out_root: Path, double_root, args) -> Tuple[str, int, str]:
+    """
+    Split one image already loaded (and checked) by load_image. Runs in a
+    worker process. Returns (status, written, detail) where status is ok or
+    failed, and detail carries the error message on failure.
+    """
+    try:
+        with im:
+            w, h = im.size
+            # load_image has already skipped single pages in auto mode
+            mode = "vertical" if args.mode == "auto" else args.mode
+
+            out1, out2 = out_paths(img_path, in_root, out_root)
+            ensure_dir(out1.parent)
+
+            suffix = img_path.suffix
+            if mode == "vertical":
+                split_x = locate_split(im, True, args.search, args.band)
+                split_x = max(1, min(w - 1, split_x))
+                src = prepare_for_save(im, suffix)
+                left = src.crop((0, 0, split_x, h))
+                right = src.crop((split_x, 0, w, h))
+                safe_save(left, out1)
+                safe_save(right, out2)
+            else:
+                split_y = locate_split(im, False, args.search, args.band)
+                split_y = max(1, min(h - 1, split_y))
+                src = prepare_for_save(im, suffix)
+                top = src.crop((0, 0, w, split_y))
+                bottom = src.crop((0, split_y, w, h))
+                safe_save(top, out1)
+                safe_save(bottom, out2)
+
+        if double_root is not None:
+            maybe_move_original(img_path, in_root, double_root)
+
+        return ("ok", 2, "")
+
+    except Exception as e:
+        return ("failed", 0, str(e))
+
+
+def process_batch(img_paths, in_root: Path, out_root: Path, double_root, args):
+    """
+    Split a batch of images in one worker, prefetching (decoding) the next
+    image on a background thread while the current one is processed. Images
+    load_image skips are never decoded.
+    Returns a list of process_one results in input order.
+    """
+    results = []
+    with ThreadPoolExecutor(max_workers=1) as io:
+        upcoming = io.submit(load_image, img_paths[0], in_root, out_root, args)
+        for i, img_path in enumerate(img_paths):
+            current = upcoming
+            if i + 1 < len(img_paths):
+                upcoming = io.submit(load_image, img_paths[i + 1], in_root, out_root, args)
+            try:
+                im = current.result()
+            except Exception as e:
+                results.append(("failed", 0, str(e)))
+                continue
+            if isinstance(im, str):
+                results.append((im, 0, ""))
+                continue
+            results.append(process_one(img_path, im, in_root, out_root, double_root, args))
+    return results
+
+
+def flush_progress(lines) -> None:
+    """Write buffered progress lines in one call and clear the buffer."""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        lines.clear()
 
 
 def main():
@@ -153,8 +396,13 @@ def main():
     ap.add_argument("--mode", choices=["auto", "vertical", "horizontal"], default="auto", help="Split direction. auto splits only landscape pages (vertical split) by aspect ratio.")
     ap.add_argument("--search", type=float, default=0.12, help="Search window fraction around center for gutter detection.")
     ap.add_argument("--band", type=float, default=0.01, help="Band thickness fraction used to score gutter ink.")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes splitting images in parallel (default: cpu count).")
 
     args = ap.parse_args()
+    if args.jobs < 1:
+        raise SystemExit("--jobs must be at least 1")
+    if sys.platform == "win32":
+        args.jobs = min(args.jobs, WINDOWS_MAX_WORKERS)
 
     in_root = Path(args.folder).expanduser().resolve()
     if not in_root.exists() or not in_root.is_dir():
@@ -162,7 +410,8 @@ def main():
 
     out_root = Path(args.out).expanduser()
     if not out_root.is_absolute():
-        out_root = (in_root / out_root).resolve()
+        out_root = in_root / out_root
+    out_root = out_root.resolve()
     ensure_dir(out_root)
 
     double_root = None
@@ -170,7 +419,8 @@ def main():
         double_root = (in_root / "double").resolve()
         ensure_dir(double_root)
 
-    imgs = list(iter_images(in_root, args.recursive))
+    exclude = [out_root] if double_root is None else [out_root, double_root]
+    imgs = list(iter_images(in_root, args.recursive, exclude=exclude))
     if not imgs:
         print(f"No images found in {in_root} (recursive={args.recursive})")
         return
@@ -180,58 +430,27 @@ def main():
     skipped_single = 0
     errors = 0
 
-    for img_path in imgs:
-        try:
-            with Image.open(img_path) as im:
-                w, h = im.size
-                mode = args.mode
-                if mode == "auto":
-                    if is_probably_double_page(w, h):
-                        mode = "vertical"
-                    else:
-                        print(f"skipped_single   | wrote    0 | {img_path}")
-                        skipped_single += 1
-                        continue
-
-                rel_parent = img_path.parent.relative_to(in_root)
-                out_dir = out_root / rel_parent
-                ensure_dir(out_dir)
-
-                suffix = img_path.suffix
-                n1, n2 = out_names(img_path.stem, suffix)
-                out1 = out_dir / n1
-                out2 = out_dir / n2
-
-                if (out1.exists() and out2.exists()) and (not args.force):
-                    print(f"skipped_existing | wrote    0 | {img_path}")
-                    continue
-
-                if mode == "vertical":
-                    split_x = find_split_vertical(im, args.search, args.band)
-                    split_x = max(1, min(w - 1, split_x))
-                    left = im.crop((0, 0, split_x, h))
-                    right = im.crop((split_x, 0, w, h))
-                    safe_save(left, out1)
-                    safe_save(right, out2)
-                else:
-                    split_y = find_split_horizontal(im, args.search, args.band)
-                    split_y = max(1, min(h - 1, split_y))
-                    top = im.crop((0, 0, w, split_y))
-                    bottom = im.crop((0, split_y, w, h))
-                    safe_save(top, out1)
-                    safe_save(bottom, out2)
-
-                total_written += 2
+    # Every image is an independent decode/analyse/save job; fan out across
+    # processes (only paths and the parsed args cross the boundary).
+    job = partial(process_batch, in_root=in_root, out_root=out_root, double_root=double_root, args=args)
+    progress = []  # buffered status lines, see PROGRESS_LINES_PER_WRITE
+    per_task = max(1, min(IMAGES_PER_TASK, -(-len(imgs) // args.jobs)))
+    batches = [imgs[k:k + per_task] for k in range(0, len(imgs), per_task)]
+    with ProcessPoolExecutor(max_workers=min(args.jobs, len(batches))) as ex:
+        results = chain.from_iterable(ex.map(job, batches))
+        for img_path, (status, written, detail) in zip(imgs, results):
+            if status == "ok":
+                total_written += written
                 total_split += 1
-
-            if double_root is not None:
-                maybe_move_original(img_path, in_root, double_root)
-
-            print(f"ok              | wrote    2 | {img_path}")
-
-        except Exception as e:
-            errors += 1
-            print(f"failed          | wrote    0 | {img_path} | {e}")
+            elif status == "skipped_single":
+                skipped_single += 1
+            elif status == "failed":
+                errors += 1
+            line = f"{status:16} | wrote {written:4d} | {img_path}"
+            progress.append(f"{line} | {detail}" if detail else line)
+            if len(progress) >= PROGRESS_LINES_PER_WRITE:
+                flush_progress(progress)
+    flush_progress(progress)
 
     print("\nSummary")
     print(f"  Input:          {in_root}")